@@ -8,6 +8,9 @@ app = FastAPI(
     description="API for accessing collected WeChat articles",
 )
 
+# one database object (and connection) for all requests
+db = ArticleDB()
+
 
 class Article(BaseModel):
     id: int
@@ -28,21 +31,36 @@ async def get_articles(
     limit: int = 100,
     offset: int = 0,
     after: Optional[int] = None,
+    before_timestamp: Optional[float] = None,
+    before_id: Optional[int] = None,
 ):
-    """Get all articles with optional filtering by username and ID
+    """Get all articles, newest first, with optional filtering by username and ID
 
     Args:
         username: Optional username to filter by
         limit: Maximum number of articles to return
-        offset: Number of articles to skip
+        offset: Number of articles to skip - deprecated, use before_timestamp/before_id
         after: Only return articles with ID greater than this value
+        before_timestamp: With before_id, only return articles older than that one - pass the last article of the previous page to get the next page without an offset
+        before_id: See before_timestamp
     """
-    db = ArticleDB()
+    if (before_timestamp is None) != (before_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="before_timestamp and before_id must be given together",
+        )
+    if offset and before_id is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="offset can't be combined with before_timestamp/before_id",
+        )
     articles = db.get_articles_paginated(
         username=username,
         limit=limit,
         offset=offset,
         after_id=after,
+        before_timestamp=before_timestamp,
+        before_id=before_id,
     )
     return articles
 
@@ -50,7 +68,6 @@ async def get_articles(
 @app.get("/articles/{username}/{title}", response_model=Article)
 async def get_article(username: str, title: str):
     """Get a specific article by username and title"""
-    db = ArticleDB()
     article = db.get_article(username, title)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
@@ -60,7 +77,4 @@ async def get_article(username: str, title: str):
 @app.get("/usernames/", response_model=List[str])
 async def get_usernames():
     """Get list of all unique usernames"""
-    db = ArticleDB()
-    articles = db.get_all_articles()
-    usernames = set(article["username"] for article in articles.values())
-    return sorted(list(usernames))
+    return db.get_unique_usernames()
@@ -1,7 +1,11 @@
 # coding:utf-8
 import logging
 import re
+import shlex
+import threading
 import time
+import uuid
+from typing import NamedTuple
 from lxml import etree
 import subprocess
 import os
@@ -11,6 +15,34 @@ load_dotenv()
 
 logger = logging.getLogger("adb_robot")
 
+# Precompiled lookups on uiautomator dumps
+XPATH_NODE_BOUNDS = etree.XPath("//node[@*[name()=$attr]=$value]/@bounds")
+BOUNDS_PATTERN = re.compile(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]")
+# Parser for uiautomator dumps: no whitespace-only text nodes, no xml:id table, and no depth limit for deeply nested layouts
+# (lxml parsers are not thread-safe - dumps are only parsed by the thread driving the device)
+UIDUMP_PARSER = etree.XMLParser(
+    remove_blank_text=True, remove_comments=True, huge_tree=True, collect_ids=False
+)
+
+
+class Bounds(NamedTuple):
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+    @property
+    def width(self):
+        return self.right - self.left
+
+    @property
+    def height(self):
+        return self.bottom - self.top
+
+    @property
+    def center(self):
+        return (self.left + self.right) // 2, (self.top + self.bottom) // 2
+
 
 class WindowManager:
     def __init__(self, wm_shell):
@@ -36,19 +68,66 @@ class ADBRobot:
         self.serial = serial
         self.temp_dump_file = temp_dump_file
         self.adb_path = adb_path
+        self._shell_session = None
+        self._shell_marker = None
+        self._shell_lock = threading.Lock()
         self.wm = WindowManager(self.wm_shell)
 
     def shell(self, cmd="", decode=True):
         """
-        Execute the specified cmd command
+        Execute the specified cmd command on the device
+        Commands are sent through a persistent adb shell session, so we don't pay for spawning adb on every call
+        stderr is merged into the output
         :param cmd:
         :return:
         """
         if not cmd:
             return ""
         logger.debug("running shell: {}".format(cmd))
+        with self._shell_lock:
+            if self._shell_session is None or self._shell_session.poll() is not None:
+                self._start_shell_session()
+            session = self._shell_session
+            end_marker = "__ADB_ROBOT_DONE_{}__".format(self._shell_marker)
+            try:
+                # the extra echo guarantees the marker lands on its own line
+                session.stdin.write(
+                    "{{ {}\n}} </dev/null 2>&1; echo; echo {}\n".format(
+                        cmd, end_marker
+                    ).encode()
+                )
+                session.stdin.flush()
+                output = []
+                for line in iter(session.stdout.readline, b""):
+                    if line.rstrip(b"\r\n") == end_marker.encode():
+                        break
+                    output.append(line)
+                else:
+                    raise BrokenPipeError("adb shell session closed")
+            except (BrokenPipeError, OSError) as e:
+                logger.warning("adb shell session failed ({}), running once".format(e))
+                self.close()
+                return self._shell_once(cmd, decode)
+        stdout = b"".join(output)[:-1]  # drop the newline added by the extra echo
+        if decode:
+            stdout = stdout.decode()
+        return stdout
+
+    def _start_shell_session(self):
+        self._shell_session = subprocess.Popen(
+            [self.adb_path, "-s", self.serial, "shell"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._shell_marker = uuid.uuid4().hex
+
+    def _shell_once(self, cmd, decode=True):
+        """
+        Execute the specified cmd command in a one-off adb shell
+        """
         proc = subprocess.Popen(
-            "{} -s {} shell {}".format(self.adb_path, self.serial, cmd),
+            "{} -s {} shell {}".format(self.adb_path, self.serial, shlex.quote(cmd)),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             shell=True,
@@ -61,7 +140,19 @@ class ADBRobot:
             return stderr
         else:
             return stdout
-        return stdout
+
+    def close(self):
+        """
+        Stop the persistent adb shell session
+        """
+        if self._shell_session is not None:
+            try:
+                self._shell_session.stdin.close()
+            except OSError:
+                pass
+            self._shell_session.kill()
+            self._shell_session.wait()
+            self._shell_session = None
 
     def wm_shell(self, wm_cmd=""):
         return self.shell(f"wm {wm_cmd}")
@@ -141,6 +232,24 @@ class ADBRobot:
     def enter(self):
         self.shell("input keyevent 66")
 
+    def key_sequence(self, keycodes, sleep=0.1):
+        """
+        Send a sequence of key events with a single adb shell call
+        e.g. key_sequence([20, 19, 20])
+        """
+        if not keycodes:
+            return
+        self.shell("input keyevent {}".format(" ".join(map(str, keycodes))))
+        time.sleep(sleep)
+
+    def keyevents(self, keycode, num_times=1, sleep=0.1):
+        """
+        Send the same key event several times with a single adb shell call
+        """
+        if num_times <= 0:
+            return
+        self.key_sequence([keycode] * num_times, sleep=sleep)
+
     def key_up(self, num_times=1):
         for _ in range(num_times):
             self.shell("input keyevent 19")
@@ -164,6 +273,16 @@ class ADBRobot:
         self.shell("input swipe {} {} {} {} {}".format(x, y, x, y, duration))
         time.sleep(sleep)
 
+    def run_inputs(self, *cmds, sleep=0.1):
+        """
+        Run several input commands in a single adb shell round-trip, pausing on the device between them
+        e.g. run_inputs("tap 310 245", "keyevent 4")
+        """
+        if not cmds:
+            return
+        self.shell("; sleep {}; ".format(sleep).join("input {}".format(cmd) for cmd in cmds))
+        time.sleep(sleep)
+
     def swipe_down(self):
         """
         Swipe down half screen
@@ -255,18 +374,21 @@ class ADBRobot:
     def uidump_and_get_node(self, retry_times=3):
         """
         Get current page node
+        The dump is streamed straight to stdout, so there's no temp file to write and read back
         """
         node = None
         error = None
 
         for _ in range(retry_times):
             try:
-                self.shell("uiautomator dump {}".format(self.temp_dump_file))
-                dumps = self.shell("cat {}".format(self.temp_dump_file), decode=False)
-                logger.debug(dumps.decode("utf-8"))
+                dumps = self.shell("uiautomator dump /dev/tty", decode=False)
+                if logger.isEnabledFor(logging.DEBUG):  # don't decode the whole dump just to drop it
+                    logger.debug(dumps.decode("utf-8", errors="replace"))
+                # drop the "UI hierchary dumped to: /dev/tty" line appended after the XML
+                dumps = dumps[: dumps.rfind(b">") + 1]
                 if not dumps.startswith(b"<"):
                     raise ValueError(dumps)
-                node = etree.XML(dumps)
+                node = etree.XML(dumps, UIDUMP_PARSER)
                 break
             except Exception as e:
                 logger.exception(e)
@@ -276,6 +398,23 @@ class ADBRobot:
             raise error
         return node
 
+    def wait_for(self, predicate, timeout=1.0, interval=0.03, max_interval=None):
+        """
+        Dump the UI until predicate(node) returns something truthy, and return that
+        If max_interval is given, the interval doubles after each attempt up to it - for long waits, where dumping all the time would only queue up dumps
+        Returns None if the timeout runs out first
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            result = predicate(self.uidump_and_get_node())
+            if result:
+                return result
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+            if max_interval:
+                interval = min(interval * 2, max_interval)
+
     def activity_top(self):
         """
         Determine what the current application is
@@ -286,46 +425,43 @@ class ADBRobot:
         if dumps is None:
             dumps = self.uidump_and_get_node()
         try:
-            bounds = dumps.xpath(
-                '//node[@{}="{}"]/@bounds'.format(attr_name, attr_value)
-            )[0]
+            bounds = XPATH_NODE_BOUNDS(dumps, attr=attr_name, value=attr_value)[0]
         except Exception:
             return False
         return bounds
 
     def get_points_in_bounds(self, bounds):
         """
-        '[42,1023][126,1080]' => 42, 1023, 126, 1080
+        '[42,1023][126,1080]' => Bounds(42, 1023, 126, 1080)
         """
-        points = re.compile(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]").match(bounds).groups()
-        return list(map(int, points))
+        points = BOUNDS_PATTERN.match(bounds).groups()
+        return Bounds(*map(int, points))
 
     def tap_bounds(self, bounds_or_view):
         """
         Useful for tapping on views that don't have a touch() method.
 
-        Bounds can be either a tuple produced by .getBounds(), e.g. ((22, 1651), (1058, 1694)), or a string like '[42,1023][126,1080]'. In any case, the coordinates are left, top, right, bottom.
+        Bounds can be already parsed Bounds, a tuple produced by .getBounds(), e.g. ((22, 1651), (1058, 1694)), or a string like '[42,1023][126,1080]'. In any case, the coordinates are left, top, right, bottom.
         """
-        if "viewclient" in type(bounds_or_view).__module__:
-            # we got a view
-            bounds = bounds_or_view.bounds()
+        if isinstance(bounds_or_view, Bounds):
+            # already parsed, nothing to do
+            center_x, center_y = bounds_or_view.center
         else:
-            bounds = bounds_or_view
-
-        # check if bounds is tuple
-        if isinstance(bounds, tuple):
-            left, top = bounds[0]
-            right, bottom = bounds[1]
-            center_x = (left + right) // 2
-            center_y = (top + bottom) // 2
-
-        else:
-            bounds_points = self.get_points_in_bounds(bounds)
-            left, top, right, bottom = bounds_points
-            center_x = (left + right) // 2
-            center_y = (top + bottom) // 2
-
-        print(f"Tapping at {center_x}, {center_y}")  # todo: use logger
+            if "viewclient" in type(bounds_or_view).__module__:
+                # we got a view
+                bounds = bounds_or_view.bounds()
+            else:
+                bounds = bounds_or_view
+
+            # check if bounds is tuple
+            if isinstance(bounds, tuple):
+                (left, top), (right, bottom) = bounds
+                center_x = (left + right) // 2
+                center_y = (top + bottom) // 2
+            else:
+                center_x, center_y = self.get_points_in_bounds(bounds).center
+
+        logger.debug("Tapping at {}, {}".format(center_x, center_y))
         self.tap(center_x, center_y)
 
     def set_clipboard_text(self, text):
@@ -56,16 +56,21 @@ def get_view_structure():
             # This is a root node
             tree[view_id] = view_map[view_id]
 
-    # Convert the tree to a nested dictionary structure
-    def build_dict_tree(node_id):
-        node = view_map[node_id].copy()
-        # Convert children array of IDs to array of nested nodes
-        children = node["children"]
-        node["children"] = [build_dict_tree(child_id) for child_id in children]
-        return node
+    # Convert the tree to a nested dictionary structure - view_map is ours, so nodes are filled in place
+    # Children are resolved before their parents (post-order), with an explicit stack rather than recursion
+    stack = [(root_id, False) for root_id in tree]
+    while stack:
+        node_id, children_done = stack.pop()
+        node = view_map[node_id]
+        if children_done:
+            # Convert children array of IDs to array of nested nodes
+            node["children"] = [view_map[child_id] for child_id in node["children"]]
+        else:
+            stack.append((node_id, True))
+            stack.extend((child_id, False) for child_id in node["children"])
 
     # Build final tree structure
-    final_tree = {root_id: build_dict_tree(root_id) for root_id in tree}
+    final_tree = {root_id: view_map[root_id] for root_id in tree}
 
     # Convert to JSON and print
     import json
@@ -1,59 +1,116 @@
 # coding:utf-8
 import time
 import os
+import re
 import argparse
+import atexit
+import hashlib
+import json
+import queue
+import threading
+from collections import OrderedDict, defaultdict
 import requests
 import urllib3
 from com.dtmilano.android.viewclient import ViewClient, AdbClient, ViewNotFoundException
 from dotenv import load_dotenv
 from lib.utils import new_stream_logger
-from core.robot import ADBRobot
+from core.robot import ADBRobot, Bounds, BOUNDS_PATTERN
 import pyperclip
-from lib.db import ArticleDB
+from lxml import etree
+from lib.db import ArticleDB, ArticleStoreStatus
 from lib.scrcpy import manage_scrcpy
 from lib.article import Article
-from datetime import datetime, timedelta, UTC
+from datetime import datetime, date, timedelta, time as dt_time
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from pathlib import Path
-from enum import Enum, auto
 from lib.keywords import KeywordExtractor
 
 # Set tokenizers parallelism to false to avoid deadlocks
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Command line arguments - only parsed when run as a script, see the bottom of the file
+parser = argparse.ArgumentParser(description="WeChat Feed Monitor")
+parser.add_argument(
+    "--usernames",
+    nargs="+",
+    help="List of WeChat accounts (usernames) to monitor",
+)
+
+# How many content hashes to remember keywords for (re-runs and translation retries
+# often hit byte-identical translated content)
+KEYWORD_CACHE_SIZE = 1024
+# where the keyword cache is kept between runs
+KEYWORD_CACHE_PATH = Path.home() / ".cache" / "wechat_feed" / "keywords.json"
+
 
 class FeedArticleItem:
     def __init__(self, node):
         self.node = node
-        self.bounds = node.xpath("@bounds")[0]
+        # parsed once from the '[x1,y1][x2,y2]' string of the uiautomator dump
+        self.bounds = Bounds(*map(int, BOUNDS_PATTERN.match(node.get("bounds")).groups()))
 
 
 def bounds(view):
     """
-    Get the bounds of a view and return as a dictionary with left, top, right, bottom, width, and height values
+    Get the bounds of a view as Bounds (left, top, right, bottom, with width and height)
+    """
+    (left, top), (right, bottom) = view.getBounds()
+    return Bounds(left, top, right, bottom)
+
+
+# Abbreviated day names as shown in the feed, mapped to datetime.weekday() numbers
+WEEKDAYS = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+
+
+# Search results for official accounts, e.g. "WeChat ID: xinhuashefabu1"
+SEARCH_RESULT_NODES = etree.XPath('//node[contains(@text, "WeChat ID:")]')
+
+
+# Article publish time as shown on the article page, e.g. 2025年01月22日 08:08
+PUBLISH_TIME_PATTERN = re.compile(r"(\d{1,4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{1,2})")
+
+
+def parse_publish_time(publish_time_string):
+    """
+    Parse an article publish time - equivalent to strptime(publish_time_string, "%Y年%m月%d日 %H:%M")
     """
-    bounds = view.getBounds()
-    return {
-        "left": bounds[0][0],
-        "top": bounds[0][1],
-        "right": bounds[1][0],
-        "bottom": bounds[1][1],
-        "width": bounds[1][0] - bounds[0][0],
-        "height": bounds[1][1] - bounds[0][1],
-    }
+    match = PUBLISH_TIME_PATTERN.fullmatch(publish_time_string)
+    if not match:
+        raise ValueError(f"Invalid publish time: {publish_time_string}")
+    return datetime(*map(int, match.groups()))  # raises ValueError on out-of-range values
 
 
-class ArticleStoreStatus(Enum):
-    SUCCESS = auto()
-    DUPLICATE = auto()
-    DATABASE_ERROR = auto()
-    INVALID_DATA = auto()  # For cases where article data is incomplete/invalid
-    UNEXPECTED_ERROR = auto()
+@lru_cache(maxsize=None)
+def parse_clock_time(time_string):
+    """
+    Parse a 12-hour clock time like "8:05 PM" - equivalent to strptime(time_string, "%I:%M %p").time(), without re-parsing the format on every call
+    Feed timestamps repeat a lot, so results are memoized
+    """
+    clock, meridiem = time_string.split(" ")
+    hour, minute = clock.split(":")
+    hour, minute, meridiem = int(hour), int(minute), meridiem.upper()
+    if not 1 <= hour <= 12 or meridiem not in ("AM", "PM"):
+        raise ValueError(f"Invalid clock time: {time_string}")
+    hour %= 12
+    if meridiem == "PM":
+        hour += 12
+    return dt_time(hour, minute)  # raises ValueError on an invalid minute
+
+
+@lru_cache(maxsize=None)
+def parse_short_date(date_string):
+    """
+    Parse a date like "1/22/25" - equivalent to strptime(date_string, "%m/%d/%y").date()
+    """
+    month, day, year = date_string.split("/")
+    return date(2000 + int(year), int(month), int(day))
 
 
 class WeChatFeedMonitor:
-    def __init__(self, serial, adb_path="adb", logger=None):
+    def __init__(self, serial, adb_path="adb", logger=None, usernames=None):
         self.serial = serial
+        self.usernames = usernames  # from the command line, takes priority over the other sources in get_usernames
         self.adb_path = adb_path
         self.logger = logger or new_stream_logger()
         self.device, self.serialno = ViewClient.connectToDeviceOrExit(serialno=serial)
@@ -61,78 +118,153 @@ class WeChatFeedMonitor:
         self.bot = ADBRobot(serial=serial, adb_path=adb_path)
         self.adb_client = AdbClient(serialno=serial)
         self.db = ArticleDB()
-        self.seen_articles = {
-            article.key: article
-            for article in map(Article.from_dict, self.db.get_all_articles().values())
-        }
-        self.seen_articles_this_run = {}
+        # only keys and URLs are needed for duplicate checks, so only those are read from the database
+        # sets, not lists - they're checked for every article
+        self.seen_articles: set[str] = set()  # Article.key of every stored article
+        self.seen_urls: set[str] = set()
+        for key, url in self.db.iter_keys_and_urls():
+            self.seen_articles.add(key)
+            if url:
+                self.seen_urls.add(url)
+        self.seen_articles_this_run: set[str] = set()
         self.clipboard = None
+        self._device_tz = None
+        self._today = None  # the device's date that relative feed timestamps were parsed against
+        self._timestamp_cache = {}  # feed timestamp string -> UTC timestamp, valid for _today
+        self._resource_id_index = None  # resource-id -> views, for the current dump
+        self._view_spans = {}  # id(view) -> (start, end) of its subtree, for the current dump
+        self._lookup_cache = {}  # (attribute, value) -> first matching view, for the current dump
+        self.es_session = requests.Session()  # keeps the connection to Elasticsearch alive
         self.keyword_extractor = KeywordExtractor()
+        self.keyword_cache = self._load_keyword_cache()  # content hash -> keywords, LRU
+        # articles are written to the database by a background thread, see store_article
+        self.store_queue = queue.Queue(maxsize=16)
+        self.articles_stored = 0  # new articles the writer has confirmed in the database since the start, to tell quiet loops apart
+        threading.Thread(target=self._store_worker, daemon=True).start()
+        # registered first so it runs last, once the writer is done adding keywords
+        atexit.register(self.save_keyword_cache)
+        # the writer is a daemon thread - store what's still queued before exiting, registered after the database's own atexit hook so it runs before the database is closed
+        atexit.register(self.wait_for_stores)
+
+    @property
+    def device_tz(self):
+        """
+        The device's timezone - queried over adb only once, as it doesn't change while we're running
+        """
+        if self._device_tz is None:
+            self._device_tz = ZoneInfo(self.bot.get_timezone())
+        return self._device_tz
 
-    def _get_view_structure(self):
+    def dump(self):
+        """
+        Dump the current view hierarchy, invalidating lookups cached for the previous dump
+        """
         self.vc.dump()
+        self._resource_id_index = None
+        self._lookup_cache.clear()
 
-        # First, collect all views into a map
-        views = self.vc.getViewsById()
-        view_map = {}
-
-        # First pass: collect all views and their properties
-        for view_id in views:
-            view = self.vc.findViewById(view_id)
-            view_map[view_id] = {
-                "id": view_id,
-                "class": view.map.get("class", ""),
-                "text": view.map.get("text", ""),
-                "content-desc": view.map.get("content-desc", ""),
-                "resource-id": view.map.get("resource-id", ""),
-                "bounds": view.map.get("bounds", ""),
-                "children": [],
-                "parent": None,
-            }
-
-        # Second pass: build parent-child relationships
-        tree = {}
-        for view_id in views:
-            view = self.vc.findViewById(view_id)
-            parent = view.getParent()
-            if parent:
-                parent_id = None
-                # Find parent's id in our map
-                for pid in view_map:
-                    if self.vc.findViewById(pid) == parent:
-                        parent_id = pid
-                        break
-                if parent_id:
-                    view_map[view_id]["parent"] = parent_id
-                    view_map[parent_id]["children"].append(view_id)
-            else:
-                # This is a root node
-                tree[view_id] = view_map[view_id]
-
-        # Convert the tree to a nested dictionary structure
-        def build_dict_tree(node_id):
-            node = view_map[node_id].copy()
-            # Convert children array of IDs to array of nested nodes
-            children = node["children"]
-            node["children"] = [build_dict_tree(child_id) for child_id in children]
-            return node
+    def find_view(self, attribute, value):
+        """
+        Same as vc.findViewWithAttribute, but remembered until the next dump
+        """
+        key = (attribute, value)
+        if key not in self._lookup_cache:
+            self._lookup_cache[key] = self.vc.findViewWithAttribute(attribute, value)
+        return self._lookup_cache[key]
 
-        # Build final tree structure
-        final_tree = {root_id: build_dict_tree(root_id) for root_id in tree}
+    def views_by_resource_id(self, resource_id):
+        """
+        Get all views of the current dump with the given resource-id, in document order
+        The index is built once per dump, on first use
+        """
+        if self._resource_id_index is None:
+            self._build_view_index()
+        return self._resource_id_index.get(resource_id, [])
 
-        return final_tree
+    def _build_view_index(self):
+        """
+        Index the current dump: views by resource-id, and the span of positions each view's subtree covers in document order, so checking if one view is below another doesn't need walking up the tree
+        """
+        views = self.vc.views  # document (pre-)order
+        self._resource_id_index = defaultdict(list)
+        self._view_spans = {}
+        for view in views:
+            self._resource_id_index[view.map.get("resource-id", "")].append(view)
+        # children come after their parents, so going backwards their spans are ready when the parent's is computed
+        for position in range(len(views) - 1, -1, -1):
+            view = views[position]
+            end = position + 1
+            for child in view.children:
+                child_span = self._view_spans.get(id(child))
+                if child_span:
+                    end = max(end, child_span[1])
+            self._view_spans[id(view)] = (position, end)
 
     def find_in_descendants(self, view, attribute="resource-id", value=None):
+        if attribute == "resource-id":
+            candidates = self.views_by_resource_id(value)
+            # views kept from an older dump have to be walked the slow way
+            span = self._view_spans.get(id(view))
+            if span:
+                start, end = span
+                return [
+                    candidate
+                    for candidate in candidates
+                    if start <= self._view_spans[id(candidate)][0] < end
+                ]
+
         found = []
-        # Check current view's resource-id
-        if view.map.get(attribute, "") == value:
-            found.append(view)
-        # Recursively check all children
-        for child in view.children:
-            found.extend(self.find_in_descendants(child, attribute, value))
+        stack = [view]
+        while stack:
+            current = stack.pop()
+            # Check current view's attribute
+            if current.map.get(attribute, "") == value:
+                found.append(current)
+            # children go on the stack reversed, so they come off it in document order
+            stack.extend(reversed(current.children))
         return found
 
+    def is_feed_item(self, view):
+        """
+        Whether a view is an item of a profile's feed that the followed-accounts flow knows how to handle: a message (bvo), a batch of articles (has by9) or a single article (has its title, qit)
+        Focus can land elsewhere (profile header, toolbar, the list itself), where the article lookups would fail
+        """
+        if not view:
+            return False
+        return bool(
+            view.map.get("resource-id", "") == "com.tencent.mm:id/bvo"
+            or self.find_in_descendants(view, "resource-id", "com.tencent.mm:id/by9")
+            or self.find_in_descendants(view, "resource-id", "com.tencent.mm:id/qit")
+        )
+
+    def find_last_in_descendants(self, view, attribute="resource-id", value=None):
+        """
+        Same as find_in_descendants(...)[-1], but stops at the first match from the end
+        Returns None if nothing matches
+        """
+        if attribute == "resource-id":
+            candidates = self.views_by_resource_id(value)
+            span = self._view_spans.get(id(view))
+            if span:
+                start, end = span
+                for candidate in reversed(candidates):
+                    if start <= self._view_spans[id(candidate)][0] < end:
+                        return candidate
+                return None
+
+        found = self.find_in_descendants(view, attribute, value)
+        return found[-1] if found else None
+
     def find_in_siblings(self, view, attribute="resource-id", value=None):
+        if attribute == "resource-id":
+            candidates = self.views_by_resource_id(value)
+            if id(view) in self._view_spans:
+                return [
+                    candidate
+                    for candidate in candidates
+                    if candidate.parent is view.parent
+                ]
+
         found = []
         siblings = view.parent.children
         for sibling in siblings:
@@ -141,32 +273,19 @@ class WeChatFeedMonitor:
         return found
 
     def store_article(self, article):
-        """Store the article in the database and update seen_articles cache.
+        """Check the article, update the seen caches and queue it for the background writer.
+
+        Keyword extraction and the database write happen in the writer thread, so they overlap with navigating to the next article. Errors there are logged, and the article is dropped from the seen caches so it can be collected again - they aren't reported back to the caller.
 
         Returns:
             ArticleStoreStatus: The status of the storage operation
-            - SUCCESS: Article was successfully added
+            - SUCCESS: Article was queued for storing - it may still fail to be written, which is only logged, so counts based on this are optimistic (articles_stored counts confirmed writes)
             - DUPLICATE: Article already exists in database
-            - DATABASE_ERROR: Database-related error occurred
             - INVALID_DATA: Article data is invalid or incomplete
-            - UNEXPECTED_ERROR: Other unexpected errors
         """
-        # Extract keywords if we have translated content
-        if article.content_translated:
-            start_time = time.time()
-            article.keywords = self.keyword_extractor.extract_keywords(
-                article.content_translated
-            )
-            extraction_time = time.time() - start_time
-
-            if article.keywords:
-                self.logger.info(
-                    f"Successfully extracted keywords from translated content in {extraction_time:.2f} seconds"
-                )
-            else:
-                self.logger.warning(
-                    f"Failed to extract keywords from translated content after {extraction_time:.2f} seconds"
-                )
+        # Skip everything else if we already know the article
+        if article.url in self.seen_urls or article.key in self.seen_articles:
+            return ArticleStoreStatus.DUPLICATE
 
         # Validate article data
         if not all(
@@ -175,7 +294,130 @@ class WeChatFeedMonitor:
             self.logger.error("Invalid article data: missing required fields")
             return ArticleStoreStatus.INVALID_DATA
 
-        success, error_msg = self.db.add_article(
+        self.seen_articles.add(article.key)
+        self.seen_articles_this_run.add(article.key)
+        self.seen_urls.add(article.url)
+        self.store_queue.put(article)
+        return ArticleStoreStatus.SUCCESS
+
+    def wait_for_stores(self):
+        """Block until the background writer has stored everything queued so far"""
+        self.store_queue.join()
+
+    def _store_worker(self):
+        while True:
+            # take everything that's waiting, so it's written in one transaction
+            batch = [self.store_queue.get()]
+            while True:
+                try:
+                    batch.append(self.store_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                statuses = self._write_articles(batch)
+            except Exception as e:
+                self.logger.error(f"Unexpected error: {e}")
+                statuses = [ArticleStoreStatus.UNEXPECTED_ERROR] * len(batch)
+
+            for article, status in zip(batch, statuses):
+                if status == ArticleStoreStatus.SUCCESS:
+                    self.articles_stored += 1
+                elif status in (
+                    ArticleStoreStatus.DATABASE_ERROR,
+                    ArticleStoreStatus.UNEXPECTED_ERROR,
+                ):
+                    # forget the article, so it's picked up again next time
+                    self.seen_articles.discard(article.key)
+                    self.seen_articles_this_run.discard(article.key)
+                    self.seen_urls.discard(article.url)
+                self.store_queue.task_done()
+
+    def _write_articles(self, articles):
+        """Extract keywords and write a batch of articles to the database - runs in the writer thread.
+
+        The batch goes in with a single transaction. If that fails, the articles are written one by one, so one bad article doesn't take the others down with it.
+
+        Returns:
+            list[ArticleStoreStatus]: The status of each article, see _write_article
+        """
+        for article in articles:
+            self._extract_keywords(article)
+
+        if len(articles) > 1:
+            statuses, error_msg = self.db.add_articles(articles)
+            if not error_msg:
+                added = statuses.count(ArticleStoreStatus.SUCCESS)
+                self.logger.info(f"{added} articles added to database.")
+                if added < len(articles):
+                    self.logger.info(
+                        f"{len(articles) - added} articles were already in the database."
+                    )
+                return statuses
+            self.logger.warning(f"Batch insert failed ({error_msg}), adding articles one by one")
+
+        return [self._write_article(article) for article in articles]
+
+    def _extract_keywords(self, article):
+        """Extract keywords from the translated content, if there is any - runs in the writer thread"""
+        if article.content_translated:
+            content_hash = hashlib.blake2b(
+                article.content_translated.encode(), digest_size=16
+            ).hexdigest()
+            if content_hash in self.keyword_cache:
+                self.keyword_cache.move_to_end(content_hash)
+                article.keywords = self.keyword_cache[content_hash]
+                self.logger.info("Reusing keywords for already processed content")
+            else:
+                start_time = time.time()
+                article.keywords = self.keyword_extractor.extract_keywords(
+                    article.content_translated
+                )
+                extraction_time = time.time() - start_time
+
+                if article.keywords:
+                    self.keyword_cache[content_hash] = article.keywords
+                    if len(self.keyword_cache) > KEYWORD_CACHE_SIZE:
+                        self.keyword_cache.popitem(last=False)
+                    self.logger.info(
+                        f"Successfully extracted keywords from translated content in {extraction_time:.2f} seconds"
+                    )
+                else:
+                    self.logger.warning(
+                        f"Failed to extract keywords from translated content after {extraction_time:.2f} seconds"
+                    )
+
+    def _load_keyword_cache(self):
+        """Read the keyword cache saved by a previous run, oldest entry first - empty if there's none or it can't be read"""
+        try:
+            return OrderedDict(json.loads(KEYWORD_CACHE_PATH.read_text()))
+        except FileNotFoundError:
+            return OrderedDict()
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Couldn't load the keyword cache, starting empty: {e}")
+            return OrderedDict()
+
+    def save_keyword_cache(self):
+        """Save the keyword cache for the next run - written to a temporary file first, so an interrupted save can't corrupt it"""
+        try:
+            KEYWORD_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = KEYWORD_CACHE_PATH.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self.keyword_cache))
+            tmp_path.replace(KEYWORD_CACHE_PATH)
+        except OSError as e:
+            self.logger.warning(f"Couldn't save the keyword cache: {e}")
+
+    def _write_article(self, article):
+        """Write a single article to the database - runs in the writer thread.
+
+        Returns:
+            ArticleStoreStatus: The status of the storage operation
+            - SUCCESS: Article was successfully added
+            - DUPLICATE: Article already exists in database
+            - DATABASE_ERROR: Database-related error occurred
+            - UNEXPECTED_ERROR: Other unexpected errors
+        """
+        status, error_msg = self.db.add_article(
             username=article.username,
             title=article.title,
             published_at=article.published_at,
@@ -193,30 +435,110 @@ class WeChatFeedMonitor:
             keywords=article.keywords,  # Keywords are already a string from the extractor
         )
 
-        if success:
-            self.seen_articles[article.key] = article
+        if status == ArticleStoreStatus.SUCCESS:
             self.logger.info("Article added to database.")
-            return ArticleStoreStatus.SUCCESS
+        elif status == ArticleStoreStatus.DUPLICATE:
+            self.logger.info("Article already in database: %s", error_msg)
         else:
-            if "Duplicate article" in error_msg:
-                return ArticleStoreStatus.DUPLICATE
-            elif "Database error" in error_msg:
-                self.logger.error(f"Database error: {error_msg}")
-                return ArticleStoreStatus.DATABASE_ERROR
+            self.logger.error(error_msg)
+        return status
+
+    def read_clipboard(self, timeout=1.0):
+        """
+        Read the computer's clipboard, giving scrcpy up to timeout seconds to sync a value different from the last URL we got
+        Polling the local clipboard is much cheaper than redoing the whole copy link sequence on the device
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while True:
+            clipboard = pyperclip.paste()
+            if clipboard != self.clipboard or time.monotonic() >= deadline:
+                return clipboard
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    def get_article_url(self):
+        """
+        Copy the link of the article currently open - cheap compared to the rest of the processing, so it's done first to allow skipping known articles
+        Returns URL of the article
+        """
+        self.logger.info("Getting article URL...")
+        # wait for the article page to load rather than sleeping a fixed time
+        if not self.bot.wait_for(
+            lambda node: self.bot.get_node_bounds("resource-id", "activity-name", node),
+            timeout=5,
+        ):
+            self.logger.warning("Article title didn't show up, trying to copy the link anyway")
+
+        got_url = False
+
+        def copy_link(retry=10):
+            attempt = 0
+            while retry > 0:
+                # tap three dots button
+                self.bot.tap(1000, 209)
+
+                # wait for the copy link button - a raw uiautomator dump is enough, we only need its bounds
+                copy_link_bounds = self.bot.wait_for(
+                    lambda node: self.bot.get_node_bounds("text", "Copy Link", node)
+                )
+                if not copy_link_bounds:
+                    self.logger.info(
+                        f"Cannot find copy link button, trying to tap the three dots again (attempt {attempt + 1})"
+                    )
+                    retry -= 1
+                    attempt += 1
+                else:
+                    # tap the button, then swipe to dismiss the clipboard popup
+                    x, y = self.bot.get_points_in_bounds(copy_link_bounds).center
+                    self.bot.run_inputs(
+                        f"tap {x} {y}", "swipe 250 2220 150 2220", sleep=0.3
+                    )
+
+                    # if scrcpy is running, it should synchronise the clipboard. Reading the device's clipboard over adb is blocked for background callers since Android 10, so we have to access the computer's clipboard.
+                    return self.read_clipboard()
+
+        while not got_url:
+            clipboard_new = copy_link()
+
+            if not clipboard_new:
+                self.logger.error("Cannot find copy link button, retrying...")
+                raise Exception("Cannot find copy link button")
+
+            self.logger.debug("Clipboard: %s", clipboard_new)
+
+            if not clipboard_new.startswith("https://"):
+                self.logger.error("Clipboard does not contain a valid URL")
+            elif clipboard_new != self.clipboard:
+                self.clipboard = clipboard_new
+                got_url = True
             else:
-                self.logger.error(f"Unexpected error: {error_msg}")
-                return ArticleStoreStatus.UNEXPECTED_ERROR
+                self.logger.info("Clipboard did not change, retrying...")
+
+        return clipboard_new
 
     def process_article_inner(self):
         """
         The actual processing of an article when already on the article page
         # todo: rename the functions or refactor to make it less confusing
-        Returns URL of the article
+        Returns metadata of the article - only the URL if the article has been stored before
+        """
+        url = self.get_article_url()
+        if url in self.seen_urls:
+            self.logger.info("Article URL already seen, skipping the rest of processing")
+            return {"url": url}
+
+        return self.get_article_body(url)
+
+    def get_article_body(self, url):
+        """
+        Get metadata and (translated) content of the article currently open
+        Returns metadata of the article
         """
 
         # Process the article
         self.logger.info("Getting article metadata...")
-        time.sleep(0.5)
+        self.dump()
 
         metadata = {}
 
@@ -244,7 +566,7 @@ class WeChatFeedMonitor:
             )
             # tap the element
             copyright_info_view.touch()
-            self.vc.dump()
+            self.dump()
             # tap the tagline (auq) to get to details - we could also match the text
             tagline_view = self.vc.findViewWithAttribute(
                 "resource-id", "com.tencent.mm:id/auq"
@@ -254,7 +576,7 @@ class WeChatFeedMonitor:
                 # wait 5 seconds for the details to load
                 # todo!: actually check if the details are loaded
                 time.sleep(5)
-                self.vc.dump()
+                self.dump()
                 # get the Weixin ID
                 # find the view with text "Weixin ID"
                 label_view = self.vc.findViewWithText("Weixin ID")
@@ -277,76 +599,18 @@ class WeChatFeedMonitor:
             metadata["op_tagline"] = None
 
         # parse published_at - the format is like 2025年01月22日 08:08
-        local_dt = datetime.strptime(published_at, "%Y年%m月%d日 %H:%M")
-        # Get device's timezone
-        device_tz = ZoneInfo(self.bot.get_timezone())
-        # Attach the device's timezone to the datetime
-        local_dt = local_dt.replace(tzinfo=device_tz)
-        # Convert to UTC timestamp
-        metadata["published_at"] = local_dt.astimezone(UTC).timestamp()
-
-        time.sleep(0.1)
-
-        got_url = False
-
-        def copy_link(retry=10):
-            base_sleep = 0.1
-            attempt = 0
-            while retry > 0:
-                # Exponential backoff sleep
-                sleep_time = base_sleep * (2**attempt)
-
-                # tap three dots button
-                self.bot.tap(1000, 209)
-
-                self.vc.dump()
-                # find the copy link button
-                copy_link_button = self.vc.findViewWithText("Copy Link")
-                if not copy_link_button:
-                    self.logger.info(
-                        f"Cannot find copy link button, trying to tap the three dots again (attempt {attempt + 1}, sleeping {sleep_time:.2f}s)"
-                    )
-                    time.sleep(sleep_time)
-                    retry -= 1
-                    attempt += 1
-                else:
-                    copy_link_button.touch()
-                    time.sleep(0.3)
-
-                    # swipe to dismiss the clipboard popup
-                    self.bot.swipe(start_x=250, start_y=2220, dx=-100)
-                    time.sleep(0.1)
-
-                    # if scrcpy is running, it should synchronise the clipboard. There might be a way to do this directly through adb. For now, we have to access the computer's clipboard.
-                    return pyperclip.paste()
-
-        while not got_url:
-            clipboard_new = copy_link()
-
-            if not clipboard_new:
-                self.logger.error("Cannot find copy link button, retrying...")
-                raise Exception("Cannot find copy link button")
-
-            self.logger.debug(f"Clipboard: {clipboard_new}")
-
-            if not clipboard_new.startswith("https://"):
-                self.logger.error("Clipboard does not contain a valid URL")
-            elif clipboard_new != self.clipboard:
-                self.clipboard = clipboard_new
-                got_url = True
-            else:
-                self.logger.info("Clipboard did not change, retrying...")
+        local_dt = parse_publish_time(published_at)
+        # Attach the device's timezone to the datetime and convert to UTC timestamp
+        metadata["published_at"] = local_dt.replace(tzinfo=self.device_tz).timestamp()
 
         def get_article_content():
-            # copy all text in the article
-            self.bot.long_tap(90, 360)  # tap title (body has a custom context menu)
-            self.bot.tap(310, 245)  # tap the select all button
-            self.bot.tap(140, 245)  # tap the copy button
-            time.sleep(0.1)
-
-            # swipe to dismiss the clipboard popup
-            self.bot.swipe(start_x=250, start_y=2220, dx=-100)
-            time.sleep(0.1)
+            # copy all text in the article, then swipe to dismiss the clipboard popup
+            self.bot.run_inputs(
+                "swipe 90 360 90 360 600",  # long tap title (body has a custom context menu)
+                "tap 310 245",  # tap the select all button
+                "tap 140 245",  # tap the copy button
+                "swipe 250 2220 150 2220",
+            )
 
             # get the clipboard
             content_raw = pyperclip.paste()
@@ -378,7 +642,7 @@ class WeChatFeedMonitor:
 
             # swipe the bottom row of buttons to reveal the translate button
             self.bot.swipe(start_x=1000, start_y=1960, dx=-500)
-            self.vc.dump()
+            self.dump()
 
             # find the copy link button
             translate_button = self.vc.findViewWithText("Translate Full Text")
@@ -390,7 +654,7 @@ class WeChatFeedMonitor:
 
             while True:
                 time.sleep(1)
-                self.vc.dump()
+                self.dump()
 
                 # check if there is a view with the text "Network error. Try again later."
                 network_error_view = self.vc.findViewWithText(
@@ -421,24 +685,30 @@ class WeChatFeedMonitor:
             metadata["title_translated"],
         ) = get_article_content()
 
-        metadata["url"] = clipboard_new
+        metadata["url"] = url
 
         return metadata
 
-    def open_and_process_article(self, view_to_click_to_open):
+    def open_and_process_article(self, view_to_click_to_open=None):
         """
         Process an article by clicking on it and then copying the link
-        Accepts a view object to click to open the article
+        Accepts a view object to click to open the article - if not given, the focused item is opened with enter, which keeps the list's key focus where it is
         Returns the URL of the article or raises an exception if processing fails
         """
         try:
             self.logger.info("Opening article")
-            self.bot.tap_bounds(view_to_click_to_open)
-            self.bot.tap_bounds(
-                view_to_click_to_open
-            )  # todo: check why double tap is needed
-            time.sleep(0.1)
-
+            if view_to_click_to_open is None:
+                self.bot.enter()
+            else:
+                self.bot.tap_bounds(view_to_click_to_open)
+                # the first tap doesn't always land - only tap again if the article page didn't open
+                if not self.bot.wait_for(
+                    lambda node: self.bot.get_node_bounds("resource-id", "activity-name", node)
+                ):
+                    self.logger.info("Article didn't open, tapping again")
+                    self.bot.tap_bounds(view_to_click_to_open)
+
+            # no sleep needed, getting the URL waits for the article page to load
             product = self.process_article_inner()
 
             self.bot.go_back()
@@ -474,6 +744,16 @@ class WeChatFeedMonitor:
                 max_articles = 10
 
         collection_timeout = int(os.getenv("COLLECTION_TIMEOUT", "30"))  # in seconds
+        # the wait doubles after each loop that found nothing new, up to this - set it to COLLECTION_TIMEOUT for a fixed wait
+        max_collection_timeout = int(
+            os.getenv("MAX_COLLECTION_TIMEOUT", str(collection_timeout * 8))
+        )
+        empty_loops = 0
+
+        # settings that don't change during the run, read once rather than per loop/article
+        skip_app_opening = os.getenv("SKIP_APP_OPENING", "").lower() == "true"
+        pin = os.getenv("PIN")
+        skip_duplicates = os.getenv("SKIP_DUPLICATES", "true").lower() == "true"
 
         # Get accounts - if provided, use search flow, otherwise use followed accounts flow
         accounts = self.get_usernames()
@@ -487,41 +767,31 @@ class WeChatFeedMonitor:
         # Main loop - reinitiate the app, navigate to the feed page, scroll up to the top
         while True:
             self.logger.info(f"Starting loop {loop_index + 1}")
+            articles_stored_before = self.articles_stored
 
             # Check if skip app opening is not true - useful for debugging to skip the long navigation to the feed page, if you can ensure you're on the right page
-            if not os.getenv("SKIP_APP_OPENING", "").lower() == "true":
+            if not skip_app_opening:
                 # Turn screen off and on again
                 self.logger.info("Turning screen off and on again")
                 self.bot.screen_off()
                 self.bot.screen_on()
 
-                if os.getenv("PIN"):
+                if pin:
                     self.logger.info("PIN provided, unlocking device")
                     # adb shell input text XXXX && adb shell input keyevent 66
-                    # repeat 66 three times with a small delay to ensure we get to the pin input
-                    self.bot.shell("input keyevent 66")
-                    time.sleep(0.25)
-                    self.bot.shell("input keyevent 66")
-                    time.sleep(0.25)
-                    self.bot.shell("input keyevent 66")
-                    time.sleep(0.25)
-                    # check if there is com.android.systemui:id/auth_ripple
-                    self.vc.dump()
-                    if not self.vc.findViewWithAttribute(
+                    # repeat 66 three times with a small delay to ensure we get to the pin input - one adb round-trip, the delays run on the device
+                    self.bot.run_inputs("keyevent 66", "keyevent 66", "keyevent 66", sleep=0.25)
+                    # check if there is com.android.systemui:id/auth_ripple - a raw dump is enough for that
+                    if not self.bot.get_node_bounds(
                         "resource-id", "com.android.systemui:id/auth_ripple"
                     ):
                         # enter pin
-                        self.bot.shell(f"input text {os.getenv('PIN')}")
-                        self.bot.shell("input keyevent 66")
-                        time.sleep(0.25)
+                        self.bot.run_inputs(f"text {pin}", "keyevent 66", sleep=0.25)
                     else:
-                        # try 82
-                        self.bot.shell("input keyevent 82")
-                        time.sleep(0.25)
-                        # enter pin
-                        self.bot.shell(f"input text {os.getenv('PIN')}")
-                        self.bot.shell("input keyevent 66")
-                        time.sleep(0.25)
+                        # try 82, then enter pin
+                        self.bot.run_inputs(
+                            "keyevent 82", f"text {pin}", "keyevent 66", sleep=0.25
+                        )
 
                 # Return to home screen
                 self.logger.info("Going to home screen")
@@ -531,20 +801,19 @@ class WeChatFeedMonitor:
                 # Open WeChat home page
                 self.logger.info("Opening WeChat home page")
                 self.ensure_wechat_front()
-                time.sleep(0.1)
 
                 # Enter subscription page
                 self.go_feed_page()
                 time.sleep(0.1)
 
                 self.logger.info("Navigating to profiles page")
-                self.vc.dump()
+                self.dump()
 
                 try:
                     view = self.vc.findViewByIdOrRaise("com.tencent.mm:id/g9")
                     view.touch()
                     time.sleep(0.1)
-                    self.vc.dump()
+                    self.dump()
                 except ViewNotFoundException:
                     self.logger.error(
                         "View with resource-id 'com.tencent.mm:id/g9' not found."
@@ -559,7 +828,7 @@ class WeChatFeedMonitor:
                         "View with text 'Followed Official Accounts' not found."
                     )
 
-            self.vc.dump()
+            self.dump()
             time.sleep(0.5)
 
             if accounts:  # Search flow
@@ -575,28 +844,32 @@ class WeChatFeedMonitor:
                         if retry_count == 4:
                             self.logger.info("Try to go back and retry...")
                             self.bot.go_back()
-                            self.vc.dump()
+                            self.dump()
                         if retry_count == 5:
                             self.logger.error(
                                 "Cannot find search icon view, ending loop..."
                             )
                             break
-                        # sometimes we need a longer delay to get the view
+                        # sometimes we need a longer delay to get the view - poll the cheap raw dump for it rather than sleeping a fixed second
                         self.logger.info("Waiting for search icon view...")
-                        time.sleep(1)
-                        self.vc.dump()
+                        self.bot.wait_for(
+                            lambda node: self.bot.get_node_bounds(
+                                "resource-id", "com.tencent.mm:id/g7", node
+                            ),
+                            interval=0.1,
+                            max_interval=0.4,
+                        )
+                        self.dump()
                         search_icon_view = self.vc.findViewById("com.tencent.mm:id/g7")
                     search_icon_view.touch()
 
                     time.sleep(0.1)
-                    self.vc.dump()
+                    self.dump()
 
                     # type the username
                     self.bot.type(username)
                     time.sleep(0.1)
                     self.bot.enter()
-                    time.sleep(0.5)
-                    self.vc.dump()
 
                     # tap the result
 
@@ -607,26 +880,30 @@ class WeChatFeedMonitor:
                     # if result_view and username in result_view.getText():
                     #     result_view.touch()
                     #     time.sleep(0.1)
-                    #     self.vc.dump()
+                    #     self.dump()
+
+                    username_lower = username.lower()
+
+                    def matching_result_bounds(node):
+                        # XPath narrows it down to the results, the username check needs to ignore case
+                        for result_node in SEARCH_RESULT_NODES(node):
+                            if username_lower in result_node.get("text", "").lower():
+                                return result_node.get("bounds")
 
                     def find_result_view_and_tap():
-                        views_by_id = self.vc.getViewsById()
-                        for view in views_by_id:
-                            if text := views_by_id[view].getText():
-                                if (
-                                    "WeChat ID:" in text
-                                    and username.lower() in text.lower()
-                                ):
-                                    views_by_id[view].touch()
-                                    time.sleep(0.1)
-                                    self.vc.dump()
-                                    return True
+                        # the results take a moment to load after hitting enter
+                        result_bounds = self.bot.wait_for(matching_result_bounds, timeout=2)
+                        if result_bounds:
+                            self.bot.tap_bounds(result_bounds)
+                            time.sleep(0.1)
+                            self.dump()
+                            return True
 
                     found_result = find_result_view_and_tap()
 
                     if not found_result:
                         # check if there is any view with the text "Official Accounts,按钮,2之2" - that's the tab heading that sometimes appears to narrow down the search results
-                        self.vc.dump()  # seems like we have to dump again
+                        self.dump()  # seems like we have to dump again
                         filter_tab_view = self.vc.findViewWithText(
                             "Official Accounts,按钮,2之2"
                         )
@@ -634,7 +911,7 @@ class WeChatFeedMonitor:
                             self.logger.info("Found filter tab button, tapping...")
                             filter_tab_view.touch()
                             time.sleep(0.1)
-                            self.vc.dump()
+                            self.dump()
                             found_result = find_result_view_and_tap()
 
                             # todo!: this may not work - sometimes searching for the username just doesn't return the official account in the results. E.g. qh_d778d44cc6f3 fails but 中国驻法兰克福总领事馆 (the display name) works. We need to add a fallback to search by display name and also supply it in usernames.txt (so it should be renamed back to accounts.txt)
@@ -645,14 +922,12 @@ class WeChatFeedMonitor:
                                 f"Cannot find result for username {username}, skipping..."
                             )
                             self.bot.go_back()  # todo: need to dismiss the keyboard too sometimes
-                            time.sleep(0.1)
-                            self.vc.dump()
+                            self.dump()
                             continue
 
                     # check if there is a com.tencent.mm:id/acf with text "Top" - if yes, we need an extra key_down to get to the latest articles
                     top_view = self.vc.findViewWithText("Top")
                     if top_view:
-                        self.bot.key_down()
                         # get the grandparent view, then its cpy child and count how many direct children it has
                         grandparent_view = top_view.parent.parent
                         cpy_views = self.find_in_descendants(
@@ -661,9 +936,8 @@ class WeChatFeedMonitor:
                         number_of_top_articles = (
                             len(cpy_views[0].children) if cpy_views else 0
                         )
-                        # press down as many times as there are top articles (or not if the view is not unfolded)
-                        for i in range(number_of_top_articles):
-                            self.bot.key_down()
+                        # one extra press down, plus as many as there are top articles (or not if the view is not unfolded)
+                        self.bot.keyevents(20, 1 + number_of_top_articles)
 
                     # display_name_view = self.vc.findViewById("com.tencent.mm:id/atj")
                     # if display_name_view:
@@ -681,7 +955,7 @@ class WeChatFeedMonitor:
                         article = Article(username=username)
                         self.bot.key_down()
                         self.bot.enter()
-                        self.vc.dump()
+                        self.dump()
 
                         # check if we are on an article view
                         article_view = self.vc.findViewWithAttribute(
@@ -691,57 +965,46 @@ class WeChatFeedMonitor:
                             # we probably tapped on the X articles remaining button, so we need to press down three times to get to the next article
                             self.bot.key_down(3)
                             self.bot.enter()
-                            self.vc.dump()
+                            self.dump()
 
                         # process the article
                         article_metadata = self.process_article_inner()
-                        # Update article attributes from metadata using dictionary unpacking
-                        article.__dict__.update(article_metadata)
+                        # Update article attributes from metadata
+                        article.update(article_metadata)
                         # Store the article immediately after getting URL
                         self.logger.info("Storing article...")
                         status = self.store_article(article)
                         if status == ArticleStoreStatus.SUCCESS:
                             pass
                         elif status == ArticleStoreStatus.DUPLICATE:
-                            if os.getenv("SKIP_DUPLICATES", "true").lower() == "true":
+                            if skip_duplicates:
                                 self.logger.info(
                                     "Article already exists in database (duplicate URL), moving to the next profile..."
                                 )
                                 # self.bot.go_back()
                                 time.sleep(0.1)
                                 break
-                        elif status == ArticleStoreStatus.DATABASE_ERROR:
-                            self.logger.warning(
-                                "Database error occurred, retrying in 5 seconds..."
-                            )
-                            time.sleep(5)
-                            continue
                         elif status == ArticleStoreStatus.INVALID_DATA:
                             self.logger.warning("Skipping article due to invalid data")
                             continue
-                        else:  # UNEXPECTED_ERROR
-                            self.logger.error(
-                                "Unexpected error occurred while storing article"
-                            )
-                            continue
 
                         # go back
                         self.bot.go_back()
-                        time.sleep(0.1)
 
                     # go back to the Official Accounts page
                     self.bot.go_back(2)
-                    self.vc.dump()
+                    self.dump()
 
             else:  # Followed accounts flow
                 self.logger.warning(
                     "No accounts provided, monitoring followed accounts only. This is not fully implemented due to the complexity of the feed page (various article display formats) and may result in errors."
                 )
 
-                usernames = [
-                    username_view.map.get("text", "")
-                    for username_view in self.vc.findViewsWithAttribute(
-                        "resource-id", "com.tencent.mm:id/lun"
+                # collect the usernames with where to tap them in one pass, the list doesn't move while we go through it
+                profile_rows = [
+                    (username_view.map.get("text", ""), username_view.getCenter())
+                    for username_view in self.views_by_resource_id(
+                        "com.tencent.mm:id/lun"
                     )
                 ]
 
@@ -751,106 +1014,32 @@ class WeChatFeedMonitor:
                 # usernames = ["中国驻安哥拉大使馆"]
 
                 for (
-                    username
-                ) in usernames:  # todo!: scroll when visible usernames are exhausted
+                    username,
+                    profile_tap,
+                ) in profile_rows:  # todo!: scroll when visible usernames are exhausted
                     articles_collected_in_profile = 0
+                    items_done = 0  # feed items (articles, batches, messages) moved past, to find our way back after a resync
 
-                    profile_item = self.vc.findViewWithText(username)
-                    profile_item.touch()
-                    time.sleep(0.1)
-                    self.vc.dump()
+                    self.bot.tap(*profile_tap)
+                    self.dump()
 
                     # we are on the articles list now
 
                     def go_back_to_profiles():
                         self.bot.go_back()
-                        time.sleep(0.1)
-                        self.vc.dump()
-
-                    def parse_timestamp(timestamp_string):
-                        try:
-                            # Get the device's timezone
-                            device_tz = ZoneInfo(self.bot.get_timezone())
-
-                            if "Yesterday" in timestamp_string:
-                                # Remove "Yesterday " prefix and parse as today, then subtract one day
-                                time_part = timestamp_string.replace("Yesterday ", "")
-                                today_time = datetime.strptime(
-                                    time_part, "%I:%M %p"
-                                ).time()
-                                local_dt = datetime.combine(
-                                    datetime.now(device_tz).date(),
-                                    today_time,
-                                ).replace(tzinfo=device_tz) - timedelta(days=1)
-                            elif "/" in timestamp_string:
-                                # Full date format
-                                local_dt = datetime.strptime(
-                                    timestamp_string, "%m/%d/%y %I:%M %p"
-                                ).replace(tzinfo=device_tz)
-                            elif any(
-                                day in timestamp_string
-                                for day in [
-                                    "Mon",
-                                    "Tue",
-                                    "Wed",
-                                    "Thu",
-                                    "Fri",
-                                    "Sat",
-                                    "Sun",
-                                ]
-                            ):
-                                # Day of week format - find the most recent matching day
-                                day_name = timestamp_string.split()[0]
-                                time_part = " ".join(timestamp_string.split()[1:])
-                                today = datetime.now(device_tz)
-
-                                # Convert day name to weekday number (0-6)
-                                target_weekday = time.strptime(day_name, "%a").tm_wday
-                                current_weekday = today.weekday()
-
-                                # Calculate days difference
-                                days_diff = (current_weekday - target_weekday) % 7
-                                if days_diff == 0:
-                                    days_diff = 7  # If today, it must be from last week
-
-                                target_date = today.date() - timedelta(days=days_diff)
-                                target_time = datetime.strptime(
-                                    time_part, "%I:%M %p"
-                                ).time()
-                                local_dt = datetime.combine(
-                                    target_date, target_time
-                                ).replace(tzinfo=device_tz)
-                            else:
-                                # Today's time only
-                                today_time = datetime.strptime(
-                                    timestamp_string, "%I:%M %p"
-                                ).time()
-                                local_dt = datetime.combine(
-                                    datetime.now(device_tz).date(),
-                                    today_time,
-                                ).replace(tzinfo=device_tz)
-
-                            # Convert to UTC timestamp
-                            return local_dt.astimezone(UTC).timestamp()
-                        except ValueError:
-                            self.logger.error(
-                                f"Failed to parse timestamp: {timestamp_string}"
-                            )
+                        self.dump()
 
-                    def go_to_first_article():
+                    def go_to_first_article(dump=True):
                         # first is the lowest one, but we get to it with a different sequence of key events depending on what type of view it is
-                        self.bot.key_down()
-                        self.bot.key_up()
-                        self.bot.key_down(
-                            len(
-                                self.vc.findViewsWithAttribute(
-                                    "resource-id", "com.tencent.mm:id/byr"
-                                )
-                            )
-                            - 1
-                        )  # go down to the last item
+                        # down and up to get the focus, then down to the last item - all in one go
+                        self.bot.key_sequence(
+                            [20, 19]
+                            + [20]
+                            * (len(self.views_by_resource_id("com.tencent.mm:id/byr")) - 1)
+                        )
                         # todo!: tab presses are more reliable
-                        self.vc.dump()
+                        if dump:
+                            self.dump()
 
                     go_to_first_article()
 
@@ -863,25 +1052,38 @@ class WeChatFeedMonitor:
                         and not profile_done
                     ):
 
-                        def go_to_next_item():
+                        def resync():
                             # go back to the profiles list
                             self.bot.go_back()
-                            self.vc.dump()
-                            # click on the username again
-                            profile_item = self.vc.findViewWithText(username)
-                            profile_item.touch()
-                            self.vc.dump()
-                            # go to first article
-                            go_to_first_article()
-                            # now go up as many times as needed to get to the next article
-                            num_up_presses = articles_collected_in_profile
-                            for i in range(num_up_presses):
-                                self.bot.shell("input keyevent 19")
-
-                            self.vc.dump()
+                            # tap the username again
+                            self.bot.tap(*profile_tap)
+                            self.dump()
+                            # go to first article - no dump yet, we dump once we're on the next article
+                            go_to_first_article(dump=False)
+                            # now go up as many times as needed to get to the next item
+                            self.bot.keyevents(19, items_done)
+
+                            self.dump()
+
+                        def go_to_next_item():
+                            # the next item is just one up from the focused one
+                            self.bot.keyevents(19)
+                            self.dump()
+                            if not self.is_feed_item(self.find_view("focused", "true")):
+                                self.logger.info(
+                                    "Focus left the feed items, navigating to the next item from the top"
+                                )
+                                resync()
 
                         # find the focused element
-                        focused_view = self.vc.findViewWithAttribute("focused", "true")
+                        focused_view = self.find_view("focused", "true")
+                        if not self.is_feed_item(focused_view):
+                            # even a resync didn't get us onto a feed item
+                            self.logger.warning(
+                                "Focus isn't on a feed item, moving to the next profile"
+                            )
+                            profile_done = True
+                            break
 
                         # if we are on a message, skip it
                         if (
@@ -890,14 +1092,14 @@ class WeChatFeedMonitor:
                         ):  # this means we're on a "message"
                             # get the timestamp - if it fails because it's not visible, we should be on the very first item in the feed
                             self.logger.info("This is a message, skipping...")
-                            articles_collected_in_profile += 1  # todo: we're counting a skipped message as an article, fix this
+                            items_done += 1
                             try:
-                                timestamp = parse_timestamp(
-                                    self.find_in_descendants(
+                                timestamp = self.parse_timestamp(
+                                    self.find_last_in_descendants(
                                         focused_view,
                                         "resource-id",
                                         "com.tencent.mm:id/c3b",
-                                    )[-1].map.get("text", "")
+                                    ).map.get("text", "")
                                 )
                             except Exception as e:
                                 self.logger.info(
@@ -927,9 +1129,9 @@ class WeChatFeedMonitor:
                             # multiple articles under the same focused_view (bvm). ql4 is for the "hero" article, qit is used for those without thumbnails
 
                             # do up and down to view the whole item with the timestamp
+                            # (no dump needed - the views below are looked up from the current focused_view)
                             self.bot.key_up()
                             self.bot.key_down()
-                            self.vc.dump()
 
                             article_views = self.find_in_descendants(
                                 focused_view, "resource-id", "com.tencent.mm:id/qit"
@@ -938,13 +1140,11 @@ class WeChatFeedMonitor:
                                 focused_view, "resource-id", "com.tencent.mm:id/ql4"
                             )
 
-                            timestamp_string = self.find_in_descendants(
+                            timestamp_string = self.find_last_in_descendants(
                                 focused_view.parent.parent,
                                 "resource-id",
                                 "com.tencent.mm:id/c3b",
-                            )[
-                                -1
-                            ].map.get(
+                            ).map.get(
                                 "text", ""
                             )  # for some reason, c3b is not a child of the parent (even though it looks like it in appium inspector). So we go one level up and find all the c3b elements and take the last one, which should be the one that belongs to this batch
 
@@ -981,20 +1181,15 @@ class WeChatFeedMonitor:
                                 )
 
                                 if c3b_views:
-                                    timestamp = parse_timestamp(
+                                    timestamp = self.parse_timestamp(
                                         c3b_views[0].map.get("text", "")
                                     )
                                 else:
                                     # go up and down to reveal the timestamp
-                                    self.bot.shell("input keyevent 19")
-                                    time.sleep(0.1)
-                                    self.bot.shell("input keyevent 20")
-                                    time.sleep(0.1)
-                                    self.vc.dump()
-                                    article_view = self.vc.findViewWithAttribute(
-                                        "focused", "true"
-                                    )
-                                    timestamp = parse_timestamp(
+                                    self.bot.run_inputs("keyevent 19", "keyevent 20")
+                                    self.dump()
+                                    article_view = self.find_view("focused", "true")
+                                    timestamp = self.parse_timestamp(
                                         self.find_in_siblings(
                                             article_view,
                                             "resource-id",
@@ -1005,7 +1200,7 @@ class WeChatFeedMonitor:
                                 article.published_at = timestamp
 
                             else:  # batch format
-                                article.published_at = parse_timestamp(timestamp_string)
+                                article.published_at = self.parse_timestamp(timestamp_string)
                                 article.title = article_view.map.get("text", "")
                                 self.logger.info(f"Title: {article.title}")
 
@@ -1016,48 +1211,45 @@ class WeChatFeedMonitor:
 
                             # Get the article URL
                             try:
+                                # single articles are focused, so we can open them without tapping and losing the focus
                                 article_metadata = self.open_and_process_article(
-                                    article_view
+                                    article_view if is_batch else None
                                 )
-                                # Update article attributes from metadata using dictionary unpacking
-                                article.__dict__.update(article_metadata)
+                                # Update article attributes from metadata
+                                article.update(article_metadata)
                                 # Store the article immediately after getting URL
                                 status = self.store_article(article)
                                 if status == ArticleStoreStatus.SUCCESS:
-                                    articles_collected_in_profile += 1
+                                    pass
                                 elif status == ArticleStoreStatus.DUPLICATE:
                                     self.logger.info(
                                         "Article already exists in database (duplicate URL)"
                                     )
                                     profile_done = True
                                     break
-                                elif status == ArticleStoreStatus.DATABASE_ERROR:
-                                    self.logger.warning(
-                                        "Database error occurred, retrying in 5 seconds..."
-                                    )
-                                    time.sleep(5)
-                                    continue
                                 elif status == ArticleStoreStatus.INVALID_DATA:
                                     self.logger.warning(
                                         "Skipping article due to invalid data"
                                     )
-                                    continue
-                                else:  # UNEXPECTED_ERROR
-                                    self.logger.error(
-                                        "Unexpected error occurred while storing article"
-                                    )
+                                    # remembered like a stored one, so coming back to it ends the profile instead of retrying it forever
+                                    self.seen_articles_this_run.add(article.key)
                                     continue
                             except Exception as e:
                                 self.logger.error(
                                     f"Error processing or storing article: {e}"
                                 )
-                                # Continue with next article even if this one fails
+                                # Continue with next article even if this one fails - but if the feed brings us back to it (e.g. Up at the top of the feed), end the profile rather than failing on it forever
+                                self.seen_articles_this_run.add(article.key)
+                                continue
 
-                            # Update collection count
+                            # Update collection count - only stored articles count (optimistically: queued, not yet written, see store_article)
                             articles_collected_in_profile += 1
                             if max_articles:
                                 self.logger.info(
-                                    f"Collected {articles_collected_in_profile}/{max_articles} articles in profile {username}"
+                                    "Collected %d/%d articles in profile %s",
+                                    articles_collected_in_profile,
+                                    max_articles,
+                                    username,
                                 )
                                 if articles_collected_in_profile >= max_articles:
                                     self.logger.info(
@@ -1067,11 +1259,18 @@ class WeChatFeedMonitor:
                                     break
                             else:
                                 self.logger.info(
-                                    f"Collected {articles_collected_in_profile} articles in profile {username}"
+                                    "Collected %d articles in profile %s",
+                                    articles_collected_in_profile,
+                                    username,
                                 )
 
+                        items_done += 1
                         if not profile_done:
-                            go_to_next_item()
+                            if is_batch:
+                                # tapping the batch's articles took the focus away from the feed
+                                resync()
+                            else:
+                                go_to_next_item()
 
                     go_back_to_profiles()
 
@@ -1088,11 +1287,20 @@ class WeChatFeedMonitor:
 
             loop_index += 1
 
-            # Apply collection timeout
-            self.logger.info(
-                f"Waiting {collection_timeout}s before next collection loop"
+            # Make sure everything collected in this loop is in the database
+            self.wait_for_stores()
+            self.save_keyword_cache()
+
+            # Apply collection timeout, backing off while there's nothing new - fewer wake-ups and dumps when the accounts are quiet
+            if self.articles_stored > articles_stored_before:
+                empty_loops = 0
+            else:
+                empty_loops += 1
+            timeout = min(
+                collection_timeout * 2 ** min(empty_loops, 16), max_collection_timeout
             )
-            time.sleep(collection_timeout)
+            self.logger.info(f"Waiting {timeout}s before next collection loop")
+            time.sleep(timeout)
 
     def ensure_wechat_front(self):
         """
@@ -1106,22 +1314,84 @@ class WeChatFeedMonitor:
         # start the app
         self.logger.info("Starting WeChat app")
         self.bot.run_app()
-        time.sleep(0.1)
 
         # Wait for WeChat to load
         self.logger.info("Waiting for WeChat to load")
-        self.vc.dump()
-        while not self.vc.findViewWithText("WeChat"):
-            time.sleep(0.1)
-            self.vc.dump()
+        if not self.wait_for_text("WeChat", timeout=60):
+            self.logger.error("WeChat didn't load in time, carrying on anyway")
 
         self.bot.run_app()
 
+    def parse_timestamp(self, timestamp_string):
+        """
+        Parse a feed timestamp (e.g. "8:05 PM", "Yesterday 8:05 PM", "Mon 8:05 PM", "1/22/25 8:05 PM") in the device's timezone
+        Results are remembered until the device's date changes - batches and re-visited items repeat the same strings
+        Returns a UTC timestamp, or None if the string can't be parsed
+        """
+        # "8:05 PM", "Yesterday ..." etc. mean something else once the day changes, even in the middle of a loop
+        today = datetime.now(self.device_tz).date()
+        if today != self._today:
+            self._today = today
+            self._timestamp_cache.clear()
+
+        timestamp = self._timestamp_cache.get(timestamp_string)
+        if timestamp is None:
+            timestamp = self._parse_timestamp(timestamp_string)
+            if timestamp is not None:
+                self._timestamp_cache[timestamp_string] = timestamp
+        return timestamp
+
+    def _parse_timestamp(self, timestamp_string):
+        try:
+            head, _, rest = timestamp_string.partition(" ")
+
+            if head == "Yesterday":
+                local_dt = datetime.combine(
+                    self._today - timedelta(days=1), parse_clock_time(rest)
+                )
+            elif "/" in head:
+                # Full date format
+                local_dt = datetime.combine(
+                    parse_short_date(head), parse_clock_time(rest)
+                )
+            elif head[:3] in WEEKDAYS:
+                # Day of week format - find the most recent matching day
+                days_diff = (self._today.weekday() - WEEKDAYS[head[:3]]) % 7
+                if days_diff == 0:
+                    days_diff = 7  # If today, it must be from last week
+
+                local_dt = datetime.combine(
+                    self._today - timedelta(days=days_diff), parse_clock_time(rest)
+                )
+            else:
+                # Today's time only
+                local_dt = datetime.combine(
+                    self._today, parse_clock_time(timestamp_string)
+                )
+
+            # Convert to UTC timestamp
+            return local_dt.replace(tzinfo=self.device_tz).timestamp()
+        except ValueError:
+            self.logger.error(f"Failed to parse timestamp: {timestamp_string}")
+
+    def wait_for_text(self, text, timeout=10):
+        """
+        Dump until a node with the given text shows up, backing off between attempts (0.2s, doubling up to 2s)
+        Uses raw uiautomator dumps, as we don't need ViewClient's view objects just to check for text
+        Returns the node's bounds, or None if it doesn't show up before the timeout
+        """
+        return self.bot.wait_for(
+            lambda node: self.bot.get_node_bounds("text", text, node),
+            timeout=timeout,
+            interval=0.2,
+            max_interval=2,
+        )
+
     def go_feed_page(self):
         """
         Enter subscription list page using ViewClient
         """
-        self.vc.dump()
+        self.dump()
         official_account = self.vc.findViewWithText("Official Account")
 
         if official_account:
@@ -1131,7 +1401,7 @@ class WeChatFeedMonitor:
             # Try scrolling to find the button if not visible
             self.bot.swipe_up()
             time.sleep(0.1)
-            self.vc.dump()
+            self.dump()
             official_account = self.vc.findViewWithText("Official Account")
             if official_account:
                 official_account.touch()
@@ -1149,35 +1419,27 @@ class WeChatFeedMonitor:
         Returns None if no accounts are found.
         """
         # First check command line arguments
-        parser = argparse.ArgumentParser(description="WeChat Feed Monitor")
-        parser.add_argument(
-            "--usernames",
-            nargs="+",
-            help="List of WeChat accounts (usernames) to monitor",
-        )
-        args = parser.parse_args()
-
-        if args.usernames:
-            return args.usernames
+        if self.usernames:
+            return self.usernames
 
         # Then check environment variable
-        usernames_env = os.getenv("USERNAMES")
+        usernames_env = os.environ.get("USERNAMES")
         if usernames_env:
             return [acc.strip() for acc in usernames_env.split(",")]
 
         # Check Elasticsearch if configured
-        es_host = os.getenv("ES_HOST")
-        es_port = os.getenv("ES_PORT", "9200")
+        es_host = os.environ.get("ES_HOST")
+        es_port = os.environ.get("ES_PORT", "9200")
         if es_host:
             try:
                 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
                 protocol = "https"  # Always use SSL as per sync_to_es.py
-                verify_certs = os.getenv("ES_VERIFY_CERTS", "false").lower() == "true"
+                verify_certs = os.environ.get("ES_VERIFY_CERTS", "false").lower() == "true"
 
                 # Get authentication credentials if provided
-                username = os.getenv("ES_USERNAME")
-                password = os.getenv("ES_PASSWORD")
+                username = os.environ.get("ES_USERNAME")
+                password = os.environ.get("ES_PASSWORD")
                 auth = (username, password) if username and password else None
 
                 # Query Elasticsearch for accounts
@@ -1188,8 +1450,13 @@ class WeChatFeedMonitor:
                     "size": 10000,  # Adjust if you have more than 10000 accounts
                 }
 
-                response = requests.post(
-                    url, json=query, verify=verify_certs, auth=auth
+                # filter_path makes Elasticsearch drop everything but the usernames from the response
+                response = self.es_session.post(
+                    url,
+                    params={"filter_path": "hits.hits._source.username"},
+                    json=query,
+                    verify=verify_certs,
+                    auth=auth,
                 )
 
                 if response.status_code == 200:
@@ -1214,16 +1481,20 @@ class WeChatFeedMonitor:
         # Finally check usernames.txt
         usernames_file = Path("usernames.txt")
         if usernames_file.exists():
-            with open(usernames_file, "r") as f:
-                # Read lines and strip whitespace, filter out empty lines
-                usernames = [line.strip() for line in f if line.strip()]
-                if usernames:
-                    return usernames
+            # Read lines and strip whitespace, filter out empty lines - stripping each line only once
+            usernames = [
+                username
+                for line in usernames_file.read_text().splitlines()
+                if (username := line.strip())
+            ]
+            if usernames:
+                return usernames
 
         return None
 
 
 if __name__ == "__main__":
+    args = parser.parse_args()  # unknown or mistyped flags are an error
     load_dotenv()
 
     device_serial = os.getenv("DEVICE_SERIAL")
@@ -1249,5 +1520,6 @@ if __name__ == "__main__":
             serial=device_serial,
             adb_path="adb",
             logger=new_stream_logger(),
+            usernames=args.usernames,
         )
         monitor.run(skip_first_batch=False)
@@ -1,15 +1,15 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from time import time
 from typing import Optional, List
 
 
-@dataclass
+@dataclass(slots=True)
 class Article:
     username: str
     title: Optional[str] = None
     published_at: Optional[float] = None
     url: Optional[str] = None
-    timestamp: float = None
+    timestamp: Optional[float] = None  # filled in when serialised, if not set
     display_name: Optional[str] = None
     id: Optional[int] = None
     repost: bool = False
@@ -24,15 +24,23 @@ class Article:
     scraped_at: Optional[float] = None
     metadata: Optional[str] = None
     keywords: Optional[str] = None
-
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = time()
+    # key cache, along with the username and title it was built from (title is often set after creation)
+    _key: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _key_username: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _key_title: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def key(self) -> str:
         """Unique identifier for the article"""
-        return f"{self.username}:{self.title}"
+        if (
+            self._key is None
+            or self._key_username is not self.username
+            or self._key_title is not self.title
+        ):
+            self._key = f"{self.username}:{self.title}"
+            self._key_username = self.username
+            self._key_title = self.title
+        return self._key
 
     def to_dict(self) -> dict:
         """Convert to dictionary for database storage"""
@@ -41,7 +49,7 @@ class Article:
             "title": self.title,
             "published_at": self.published_at,
             "url": self.url,
-            "timestamp": self.timestamp,
+            "timestamp": self.timestamp if self.timestamp is not None else time(),
             "display_name": self.display_name,
             "id": self.id,
             "repost": self.repost,
@@ -58,6 +66,12 @@ class Article:
             "keywords": self.keywords,
         }
 
+    def update(self, data: dict) -> None:
+        """Set fields from a dictionary, ignoring keys that aren't article fields"""
+        for name, value in data.items():
+            if name in self.__slots__ and not name.startswith("_"):
+                setattr(self, name, value)
+
     @classmethod
     def from_dict(cls, data: dict) -> "Article":
         """Create an Article instance from a dictionary"""
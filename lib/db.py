@@ -1,18 +1,138 @@
+import atexit
+import queue
 import sqlite3
-import time
+import threading
+import warnings
 from contextlib import contextmanager
+from pathlib import Path
+from enum import Enum, auto
+from functools import lru_cache
 from typing import Optional
 from .article import Article
 
+# INSERT ... RETURNING (add_article) needs SQLite 3.35 - fail on import rather than on the first insert
+if sqlite3.sqlite_version_info < (3, 35, 0):
+    raise ImportError(
+        f"SQLite 3.35 or newer is required, Python is linked against {sqlite3.sqlite_version}"
+    )
+
+
+class ArticleStoreStatus(Enum):
+    SUCCESS = auto()
+    DUPLICATE = auto()
+    DATABASE_ERROR = auto()
+    INVALID_DATA = auto()  # For cases where article data is incomplete/invalid
+    UNEXPECTED_ERROR = auto()
+
+
+# Articles that clash with a stored one (same URL, or same username and title) are skipped
+# timestamp is stamped by SQLite itself, as unix time with sub-second precision (unixepoch('now', 'subsec') needs SQLite 3.42)
+INSERT_ARTICLE_SQL = """
+    INSERT OR IGNORE INTO articles (
+        username, title, published_at, timestamp, url, 
+        display_name, repost, op_display_name, op_username,
+        content, content_raw, content_translated, content_translated_raw,
+        title_translated, metadata, keywords
+    )
+    VALUES (
+        ?, ?, ?, (julianday('now') - 2440587.5) * 86400.0, ?,
+        ?, ?, ?, ?,
+        ?, ?, ?, ?,
+        ?, ?, ?
+    )
+"""
+
+# Same, returning the new id - no row comes back if the article was skipped
+INSERT_ARTICLE_RETURNING_SQL = INSERT_ARTICLE_SQL + "RETURNING id"
+
+@lru_cache(maxsize=None)
+def paginated_articles_sql(by_username: bool, by_id: bool, by_keyset: bool) -> str:
+    """get_articles_paginated's query for a combination of filters - built once per combination, so sqlite3's statement cache sees the same string every time"""
+    conditions = []
+    if by_username:
+        conditions.append("username = ?")
+    if by_id:
+        conditions.append("id > ?")
+    if by_keyset:
+        conditions.append("(timestamp, id) < (?, ?)")
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # id breaks ties, so keyset pages neither skip nor repeat articles with the same timestamp
+    return f"""
+        SELECT * FROM articles
+        {where_clause}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ? OFFSET ?
+    """
+
+
+# Columns update_article may set - names are interpolated into its SQL, so nothing else gets through
+UPDATABLE_ARTICLE_COLUMNS = frozenset(
+    {
+        "username",
+        "title",
+        "published_at",
+        "timestamp",
+        "url",
+        "display_name",
+        "repost",
+        "op_display_name",
+        "op_username",
+        "content",
+        "content_raw",
+        "content_translated",
+        "content_translated_raw",
+        "title_translated",
+        "scraped_at",
+        "metadata",
+        "keywords",
+    }
+)
+
+
+@lru_cache(maxsize=64)
+def update_article_sql(columns: tuple[str, ...]) -> str:
+    """UPDATE statement for the given columns - built once per set of columns, so sqlite3's statement cache sees the same string every time"""
+    set_clause = ", ".join(f"{column} = ?" for column in columns)
+    return f"""
+        UPDATE articles 
+        SET {set_clause}
+        WHERE (username = ? AND title = ?) OR url = ?
+    """
+
 
 class ArticleDB:
     def __init__(self, db_path="articles.db"):
         self.db_path = db_path
+        # one writer connection for the lifetime of the object, shared between threads (the monitor writes from a background thread)
+        # implicit transactions start with BEGIN IMMEDIATE: the write lock is taken up front, so another process's writer makes us wait (up to the 5 s busy timeout) instead of failing with SQLITE_BUSY halfway through
+        self._conn = self._connect(self.db_path, isolation_level="IMMEDIATE")
+        # with WAL, synchronous=NORMAL only syncs at checkpoints, not on every commit
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        # read-only connections, opened as needed and reused - with WAL, reads don't wait for the writer
+        # in-memory and temporary databases (":memory:", "") can't be opened a second time, so they're read through the writer
+        self._readers = queue.SimpleQueue()
+        self._has_readers = str(db_path) not in (":memory:", "")
         self._init_db()
+        # make sure the WAL gets checkpointed and the connections closed, even if nobody calls close()
+        atexit.register(self.close)
+
+    def _connect(self, database, **kwargs):
+        """Open a connection with the settings shared by the writer and the readers"""
+        conn = sqlite3.connect(
+            database, check_same_thread=False, cached_statements=256, **kwargs
+        )
+        conn.row_factory = sqlite3.Row  # rows convert to dicts in C, see _row_to_dict
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")  # ~20 MB
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        return conn
 
     def _init_db(self):
         """Initialize the database and create tables if they don't exist"""
         with self._get_connection() as conn:
+            # WAL is stored in the database file, so it only needs setting once - readers (API, ES sync) don't block the writer and commits don't rewrite a rollback journal
+            conn.execute("PRAGMA journal_mode=WAL")
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS articles (
@@ -37,16 +157,63 @@ class ArticleDB:
                     UNIQUE(username, title)
                 )
             """)
+            # (username, title) and url already have indexes through their UNIQUE constraints - these are for the newest-first listings
+            # ascending, so that read backwards they give (timestamp, id) descending, with no sorting of ties
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_articles_ts ON articles(timestamp)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_articles_username_ts ON articles(username, timestamp)"
+            )
+            # hash of each article as sync_to_es last sent it, so unchanged articles aren't sent again
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS synced_articles (
+                    id INTEGER PRIMARY KEY,  -- articles.id
+                    hash BLOB NOT NULL
+                )
+            """)
             conn.commit()
 
     @contextmanager
     def _get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
+        """Context manager for the shared connection - holds the lock, and rolls back whatever was left uncommitted"""
+        with self._lock:
+            try:
+                yield self._conn
+            finally:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+
+    @contextmanager
+    def _get_read_connection(self):
+        """Context manager for a read-only connection from the pool - doesn't take the writer's lock"""
+        if not self._has_readers:
+            with self._get_connection() as conn:
+                yield conn
+            return
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect(
+                f"{Path(self.db_path).absolute().as_uri()}?mode=ro", uri=True
+            )
         try:
             yield conn
         finally:
-            conn.close()
+            self._readers.put(conn)
+
+    def close(self):
+        """Close the database connections - also called at exit, if the owner didn't"""
+        # the atexit hook holds a reference to us, so it has to go for the object to be freed
+        atexit.unregister(self.close)
+        # readers first - the last connection to close checkpoints the WAL, which a read-only one can't do
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._conn.close()
 
     def add_article(
         self,
@@ -65,7 +232,7 @@ class ArticleDB:
         title_translated: Optional[str] = None,
         metadata: Optional[str] = None,
         keywords: Optional[str] = None,
-    ) -> tuple[bool, str]:
+    ) -> tuple[ArticleStoreStatus, str]:
         """Add or update an article in the database
 
         Args:
@@ -86,44 +253,23 @@ class ArticleDB:
             keywords: JSON array of extracted keywords from content_translated
 
         Returns:
-            tuple[bool, str]: (success, error_message)
-            - If successful: (True, "")
-            - If duplicate: (False, "Duplicate article: {url}")
-            - If database error: (False, "Database error: {error}")
-            - If other error: (False, "Unexpected error: {error}")
+            tuple[ArticleStoreStatus, str]: (status, error_message)
+            - If successful: (SUCCESS, "")
+            - If duplicate: (DUPLICATE, "Duplicate article: {url}")
+            - If database error: (DATABASE_ERROR, "Database error: {error}")
+            - If other error: (UNEXPECTED_ERROR, "Unexpected error: {error}")
         """
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
 
-                # First check if article exists
+                # the duplicate check and the insert are one statement
                 cursor.execute(
-                    """
-                    SELECT url FROM articles 
-                    WHERE (username = ? AND title = ?) OR url = ?
-                    """,
-                    (username, title, url),
-                )
-                existing = cursor.fetchone()
-                if existing:
-                    return False, f"Duplicate article: {existing[0]}"
-
-                # If we get here, article doesn't exist, so insert it
-                cursor.execute(
-                    """
-                    INSERT INTO articles (
-                        username, title, published_at, timestamp, url, 
-                        display_name, repost, op_display_name, op_username,
-                        content, content_raw, content_translated, content_translated_raw,
-                        title_translated, metadata, keywords
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
+                    INSERT_ARTICLE_RETURNING_SQL,
                     (
                         username,
                         title,
                         published_at,
-                        time.time(),
                         url,
                         display_name,
                         repost,
@@ -138,12 +284,67 @@ class ArticleDB:
                         keywords,
                     ),
                 )
+                inserted = cursor.fetchone()
                 conn.commit()
-                return True, ""
+                if inserted is None:
+                    return ArticleStoreStatus.DUPLICATE, f"Duplicate article: {url}"
+                return ArticleStoreStatus.SUCCESS, ""
         except sqlite3.Error as e:
-            return False, f"Database error: {str(e)}"
+            return ArticleStoreStatus.DATABASE_ERROR, f"Database error: {str(e)}"
         except Exception as e:
-            return False, f"Unexpected error: {str(e)}"
+            return ArticleStoreStatus.UNEXPECTED_ERROR, f"Unexpected error: {str(e)}"
+
+    def add_articles(
+        self, articles: list[Article]
+    ) -> tuple[list[ArticleStoreStatus], str]:
+        """Add several articles in a single transaction
+
+        Articles that clash with a stored one are skipped, same as with add_article.
+        If the batch fails as a whole, nothing is written - callers can fall back to add_article per article.
+
+        Returns:
+            tuple[list[ArticleStoreStatus], str]: (statuses, error_message)
+            - If successful: (SUCCESS or DUPLICATE for each article, "")
+            - If database error: (DATABASE_ERROR for each article, "Database error: {error}")
+            - If other error: (UNEXPECTED_ERROR for each article, "Unexpected error: {error}")
+        """
+        try:
+            with self._get_connection() as conn:
+                statuses = []
+                with conn:  # one transaction, committed at the end or rolled back on error
+                    # one execute per article rather than executemany, to tell inserted rows from ignored ones
+                    for article in articles:
+                        cursor = conn.execute(
+                            INSERT_ARTICLE_SQL,
+                            (
+                                article.username,
+                                article.title,
+                                article.published_at,
+                                article.url,
+                                article.display_name,
+                                article.repost,
+                                article.op_display_name,
+                                article.op_username,
+                                article.content,
+                                article.content_raw,
+                                article.content_translated,
+                                article.content_translated_raw,
+                                article.title_translated,
+                                None,  # metadata is populated by the scraper later, if used
+                                article.keywords,
+                            ),
+                        )
+                        statuses.append(
+                            ArticleStoreStatus.SUCCESS
+                            if cursor.rowcount
+                            else ArticleStoreStatus.DUPLICATE
+                        )
+                return statuses, ""
+        except sqlite3.Error as e:
+            status, error_msg = ArticleStoreStatus.DATABASE_ERROR, f"Database error: {str(e)}"
+        except Exception as e:
+            status, error_msg = ArticleStoreStatus.UNEXPECTED_ERROR, f"Unexpected error: {str(e)}"
+        return [status] * len(articles), error_msg
 
     def update_article(
         self, username: str, title: str, url: str, **kwargs
@@ -160,8 +361,13 @@ class ArticleDB:
             tuple[bool, str]: (success, error_message)
             - If successful: (True, "")
             - If article not found: (False, "Article not found")
+            - If a field isn't an updatable column: (False, "Unknown fields: {fields}")
             - If database error: (False, "Database error: {error}")
         """
+        unknown_fields = kwargs.keys() - UPDATABLE_ARTICLE_COLUMNS
+        if unknown_fields:
+            return False, f"Unknown fields: {', '.join(sorted(unknown_fields))}"
+
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
@@ -182,18 +388,10 @@ class ArticleDB:
                 if not kwargs:
                     return True, ""  # Nothing to update
 
-                set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
                 values = list(kwargs.values())
                 values.extend([username, title, url])  # For WHERE clause
 
-                cursor.execute(
-                    f"""
-                    UPDATE articles 
-                    SET {set_clause}
-                    WHERE (username = ? AND title = ?) OR url = ?
-                    """,
-                    values,
-                )
+                cursor.execute(update_article_sql(tuple(kwargs)), values)
                 conn.commit()
                 return True, ""
         except sqlite3.Error as e:
@@ -203,20 +401,21 @@ class ArticleDB:
 
     def article_exists(self, username, title):
         """Check if an article exists in the database"""
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                SELECT COUNT(*) FROM articles 
+                SELECT 1 FROM articles 
                 WHERE username = ? AND title = ?
+                LIMIT 1
             """,
                 (username, title),
             )
-            return cursor.fetchone()[0] > 0
+            return cursor.fetchone() is not None
 
     def get_article(self, username: str, title: str) -> Optional[Article]:
         """Get article details from the database"""
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT * FROM articles WHERE username = ? AND title = ?",
@@ -224,65 +423,115 @@ class ArticleDB:
             )
             row = cursor.fetchone()
             if row:
-                return self._row_to_dict(row, cursor)
+                return self._row_to_dict(row)
             return None
 
     def get_all_articles(self):
-        """Get all articles from the database"""
+        """Get all articles from the database, by (username, title)
+
+        Deprecated: this holds the whole table in memory - iterate iter_all_articles() instead, or use get_article()/article_exists() for lookups
+        """
+        warnings.warn(
+            "get_all_articles() is deprecated, use iter_all_articles()",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return dict(self.iter_all_articles())
+
+    def iter_all_articles(self):
+        """Yield ((username, title), article) for every article, one by one, without holding them all in memory"""
+        with self._get_read_connection() as conn:
+            for row in conn.execute("SELECT * FROM articles"):
+                yield (row["username"], row["title"]), self._row_to_dict(row)
+
+    def iter_articles_with_sync_hashes(self):
+        """Yield (article, hash) for every article, hash being what set_sync_hashes last stored for it, or None"""
+        with self._get_read_connection() as conn:
+            for row in conn.execute("""
+                SELECT articles.*, synced_articles.hash AS sync_hash
+                FROM articles LEFT JOIN synced_articles USING (id)
+            """):
+                article = self._row_to_dict(row)
+                yield article, article.pop("sync_hash")
+
+    def set_sync_hashes(self, hashes: list[tuple[int, bytes]]):
+        """Store (article id, hash) pairs for articles that were synced, in one transaction"""
         with self._get_connection() as conn:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO synced_articles (id, hash) VALUES (?, ?)
+                    ON CONFLICT(id) DO UPDATE SET hash = excluded.hash
+                    """,
+                    hashes,
+                )
+
+    def iter_keys_and_urls(self):
+        """Yield (key, url) for every article, without loading the rest of the row
+
+        The key matches Article.key, which the monitor's seen cache is keyed by
+        """
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM articles")
-            return {
-                f"{row[1]}:{row[2]}": self._row_to_dict(row, cursor)
-                for row in cursor.fetchall()
-            }
+            cursor.execute("SELECT username, title, url FROM articles")
+            for username, title, url in cursor:
+                yield f"{username}:{title}", url
+
+    def get_articles_paginated(
+        self,
+        username=None,
+        limit=100,
+        offset=0,
+        after_id=None,
+        before_timestamp=None,
+        before_id=None,
+    ):
+        """Get articles, newest first, with pagination and optional username filter
 
-    def get_articles_paginated(self, username=None, limit=100, offset=0, after_id=None):
-        """Get articles with pagination and optional username filter
+        For deep pages, pass the timestamp and id of the last article of the previous page as before_timestamp and before_id rather than an offset - skipping rows with an offset means reading them first.
 
         Args:
             username: Optional username to filter by
             limit: Maximum number of articles to return
-            offset: Number of articles to skip
+            offset: Number of articles to skip - deprecated, use before_timestamp/before_id
             after_id: Only return articles with ID greater than this value
+            before_timestamp: Only return articles older than the one with this timestamp and before_id
+            before_id: See before_timestamp
         """
-        with self._get_connection() as conn:
+        by_keyset = before_timestamp is not None and before_id is not None
+        if offset:
+            warnings.warn(
+                "offset pagination is deprecated, use before_timestamp/before_id",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        params = []
+        if username:
+            params.append(username)
+        if after_id:
+            params.append(after_id)
+        if by_keyset:
+            params += [before_timestamp, before_id]
+        params += [limit, offset]
+
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
-            base_query = "SELECT * FROM articles"
-
-            if username and after_id:
-                where_clause = "WHERE username = ? AND id > ?"
-                params = (username, after_id, limit, offset)
-            elif username:
-                where_clause = "WHERE username = ?"
-                params = (username, limit, offset)
-            elif after_id:
-                where_clause = "WHERE id > ?"
-                params = (after_id, limit, offset)
-            else:
-                where_clause = ""
-                params = (limit, offset)
-
-            query = f"""
-                {base_query}
-                {where_clause}
-                ORDER BY timestamp DESC
-                LIMIT ? OFFSET ?
-            """
-            cursor.execute(query, params)
-            return [self._row_to_dict(row, cursor) for row in cursor.fetchall()]
+            cursor.execute(
+                paginated_articles_sql(bool(username), bool(after_id), by_keyset),
+                params,
+            )
+            return [self._row_to_dict(row) for row in cursor]
 
     def get_unique_usernames(self):
         """Get list of all unique usernames"""
-        with self._get_connection() as conn:
+        with self._get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT DISTINCT username FROM articles ORDER BY username")
-            return [row[0] for row in cursor.fetchall()]
+            return [row[0] for row in cursor]
 
-    def _row_to_dict(self, row: tuple, cursor) -> dict:
+    def _row_to_dict(self, row: sqlite3.Row) -> dict:
         """Convert a database row to a dictionary"""
-        columns = [desc[0] for desc in cursor.description]  # Get column names
-        result = dict(zip(columns, row))
+        result = dict(row)
 
         # Handle any type conversions
         if "repost" in result:
@@ -1,11 +1,51 @@
+import atexit
 import subprocess
 import os
 import logging
+import signal
+import threading
 from contextlib import contextmanager
-import time
 
 logger = logging.getLogger(__name__)
 
+# scrcpy logs the device's name once it's connected to it, windowed or not
+READY_MARKER = "Device:"
+# how long to wait for it before carrying on regardless
+STARTUP_TIMEOUT = 5
+
+
+def _follow_output(process: subprocess.Popen, ready: threading.Event):
+    """Log scrcpy's output, setting ready when it's connected - keeps reading until scrcpy exits, so the pipe never fills up"""
+    for line in process.stdout:
+        logger.debug(f"scrcpy: {line.rstrip()}")
+        if READY_MARKER in line:
+            ready.set()
+    ready.set()  # scrcpy exited - nothing left to wait for
+
+
+def _signal_scrcpy(process: subprocess.Popen, sig: int):
+    """Send sig to scrcpy's whole process group (it runs in its own session), or just to scrcpy where there are no process groups"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, sig)
+        else:
+            process.send_signal(sig)
+    except ProcessLookupError:
+        pass  # already gone
+
+
+def _stop_scrcpy(process: subprocess.Popen):
+    """Stop scrcpy and anything it started, killing them if they don't terminate within 5 seconds"""
+    if process.poll() is not None:
+        return
+    logger.info("Stopping scrcpy...")
+    _signal_scrcpy(process, signal.SIGTERM)
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        logger.warning("scrcpy didn't terminate gracefully, forcing kill...")
+        _signal_scrcpy(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+
 
 @contextmanager
 def manage_scrcpy(serial: str):
@@ -30,21 +70,27 @@ def manage_scrcpy(serial: str):
 
             scrcpy_process = subprocess.Popen(
                 args,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                start_new_session=True,  # we stop it ourselves, it shouldn't get the terminal's Ctrl+C
             )
+            # in case we exit without going through finally (e.g. sys.exit from another thread), so scrcpy doesn't keep holding the device
+            atexit.register(_stop_scrcpy, scrcpy_process)
 
-            # Give scrcpy time to initialize
-            time.sleep(2)
+            # Wait for scrcpy to connect rather than sleeping a fixed time
+            ready = threading.Event()
+            threading.Thread(
+                target=_follow_output, args=(scrcpy_process, ready), daemon=True
+            ).start()
+            if not ready.wait(STARTUP_TIMEOUT):
+                logger.warning("scrcpy isn't ready yet, carrying on anyway")
+            elif scrcpy_process.poll() is not None:
+                logger.warning(f"scrcpy exited with code {scrcpy_process.returncode}")
 
         yield
 
     finally:
         if scrcpy_process:
-            logger.info("Stopping scrcpy...")
-            scrcpy_process.terminate()
-            try:
-                scrcpy_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                logger.warning("scrcpy didn't terminate gracefully, forcing kill...")
-                scrcpy_process.kill()
+            _stop_scrcpy(scrcpy_process)
+            atexit.unregister(_stop_scrcpy)
@@ -1,5 +1,11 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import blake2b
+from itertools import batched
+import json
 from lib.db import ArticleDB
 import requests
+from requests.adapters import HTTPAdapter
 from lib.utils import new_stream_logger
 from os import getenv
 from dotenv import load_dotenv
@@ -8,37 +14,83 @@ logger = new_stream_logger(__name__)
 load_dotenv()  # Load environment variables from .env file
 
 
+def article_hash(article: dict) -> bytes:
+    """Hash of an article as it's sent, to tell whether it changed since the last sync"""
+    return blake2b(
+        json.dumps(article, sort_keys=True).encode(), digest_size=16
+    ).digest()
+
+
+def changed_articles(db: ArticleDB, sync_all: bool = False):
+    """Yield (id, hash, article) for the articles that changed since they were last synced - or for all of them, if sync_all"""
+    for article, synced_hash in db.iter_articles_with_sync_hashes():
+        article_id = article.pop("id")  # Remove id field
+        digest = article_hash(article)
+        if sync_all or digest != synced_hash:
+            yield article_id, digest, article
+
+
+def post_batch(session: requests.Session, api_url: str, batch: list[dict]) -> dict:
+    """Send one batch of articles to the API, returning its counts"""
+    response = session.post(api_url, json=batch)
+    response.raise_for_status()
+    return response.json()
+
+
+def finish_batch(
+    db: ArticleDB,
+    batch_number: int,
+    hashes: list[tuple[int, bytes]],
+    future: Future,
+):
+    """Wait for a batch to be sent, log how it went and, if every article made it, remember them as synced"""
+    result = future.result()
+    logger.info(
+        f"Batch {batch_number}: "
+        f"Succeeded: {result['success_count']}, "
+        f"Failed: {result['error_count']}"
+    )
+    # the API doesn't say which articles failed, so a partly failed batch is sent again next time
+    if not result["error_count"]:
+        db.set_sync_hashes(hashes)
+
+
 def sync_to_elasticsearch():
     # Initialize DB connection
     db = ArticleDB()
 
-    # Fetch articles
-    articles_dict = db.get_all_articles()
-
     # Get API configuration from environment variables
     api_host = getenv("API_HOST", "localhost")
     api_port = getenv("API_PORT", "8000")
     api_url = f"http://{api_host}:{api_port}/articles/bulk"
+    # How many batches to have in flight at once
+    concurrency = int(getenv("ES_CONCURRENCY", "4"))
+    # Send everything, not just what changed since the last sync (e.g. after the index was recreated)
+    sync_all = getenv("SYNC_ALL", "").lower() == "true"
 
-    # Prepare articles list
-    articles = []
-    for article_key, article_data in articles_dict.items():
-        article_data.pop("id", None)  # Remove id field
-        articles.append(article_data)
+    # Stream the articles rather than loading them all at once
+    articles = changed_articles(db, sync_all)
 
-    # Send to API in batches
+    # Send to API in batches, over kept-alive connections rather than a new one (and TLS handshake) per batch
     batch_size = 100
-    for i in range(0, len(articles), batch_size):
-        batch = articles[i : i + batch_size]
-        response = requests.post(
-            api_url,
-            json=batch,
-            verify=False,  # Only if using self-signed certs
-        )
-        response.raise_for_status()
-        result = response.json()
-        logger.info(
-            f"Batch {i // batch_size + 1}: "
-            f"Succeeded: {result['success_count']}, "
-            f"Failed: {result['error_count']}"
-        )
+    with (
+        requests.Session() as session,
+        ThreadPoolExecutor(max_workers=concurrency) as executor,
+    ):
+        session.verify = False  # Only if using self-signed certs
+        adapter = HTTPAdapter(pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        # Batches are submitted as they're read and logged in order, with at most `concurrency` of them waiting - so the whole table is never held in memory
+        in_flight = deque()
+        for batch_number, batch in enumerate(batched(articles, batch_size), start=1):
+            hashes = [(article_id, digest) for article_id, digest, _ in batch]
+            future = executor.submit(
+                post_batch, session, api_url, [article for _, _, article in batch]
+            )
+            in_flight.append((batch_number, hashes, future))
+            if len(in_flight) >= concurrency:
+                finish_batch(db, *in_flight.popleft())
+        while in_flight:
+            finish_batch(db, *in_flight.popleft())